@@ -2,21 +2,94 @@
 
 The default implementation uses a local OLLAMA server, but any client object
 providing a ``generate`` method can be supplied, enabling use of remote APIs
-such as OpenAI's chat completions.
+such as OpenAI's chat completions. Clients that also provide ``agenerate`` can
+be driven asynchronously, which allows many independent conversations to run
+concurrently.
 """
 from __future__ import annotations
 
-from typing import List, Tuple, Protocol, runtime_checkable, cast
+import copy
+import re
+import sys
+from itertools import cycle
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Protocol,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
-from ollama_client import OllamaClient
+from token_budget import MESSAGE_OVERHEAD, RESPONSE_TOKENS, TokenEstimator
+
+if TYPE_CHECKING:  # pragma: no cover - imported lazily at runtime
+    import asyncio
+
+    from ollama_client import OllamaClient
+
+
+Message = Dict[str, str]
+S = TypeVar("S")
+
+
+class Turn(NamedTuple):
+    """One response of a conversation and the model that produced it."""
+
+    model: str
+    text: str
 
 
-@runtime_checkable
 class LLMClient(Protocol):
-    """Protocol describing the methods a language model client must provide."""
+    """Protocol describing the methods a language model client must provide.
+
+    Clients may additionally provide ``chat(model, messages, stream=False, *,
+    options=None, timeout=None, **kwargs)``. When present it is used instead
+    of :meth:`generate` and receives the conversation as role-tagged
+    messages, which lets servers such as OLLAMA reuse their cache for the
+    unchanged start of the conversation.
+    """
 
-    def generate(self, model: str, prompt: str, stream: bool = False, **kwargs: object) -> str:
-        """Return a completion for ``prompt`` from ``model``."""
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        stream: bool = False,
+        *,
+        options: Dict[str, object] | None = None,
+        timeout: float | None = None,
+        **kwargs: object,
+    ) -> str:
+        """Return a completion for ``prompt`` from ``model``.
+
+        ``options`` are model options such as ``temperature``; ``timeout`` is
+        the request timeout in seconds, ``None`` meaning the client's default.
+        """
+
+
+class AsyncLLMClient(Protocol):
+    """Protocol describing the methods an asynchronous client must provide.
+
+    As with :class:`LLMClient`, an optional ``achat`` method is preferred over
+    :meth:`agenerate` when available.
+    """
+
+    async def agenerate(
+        self,
+        model: str,
+        prompt: str,
+        stream: bool = False,
+        *,
+        options: Dict[str, object] | None = None,
+        timeout: float | None = None,
+        **kwargs: object,
+    ) -> str:
+        """Return a completion for ``prompt`` from ``model`` without blocking."""
 
 
 def have_conversation(
@@ -27,9 +100,23 @@ def have_conversation(
     client: LLMClient | None = None,
     system_a: str | None = None,
     system_b: str | None = None,
-) -> List[Tuple[str, str]]:
+    options: Dict[str, object] | None = None,
+    window: int | None = None,
+    summary_fn: Callable[[List[str]], str] | None = None,
+    fit_context: bool = False,
+    preload: bool = False,
+) -> List[Turn]:
     """Have two models converse by generating responses alternately.
 
+    Each model keeps its own list of chat messages: its system prompt first,
+    then the initial prompt as a ``user`` message, then its own replies as
+    ``assistant`` messages and the other model's replies as ``user`` messages.
+
+    The system prompt and ``prompt`` are sent unchanged at the start of every
+    request, which is what allows OLLAMA and similar servers to reuse their
+    cache instead of reprocessing them each turn. Keep them identical between
+    conversations that should share that cache.
+
     Parameters
     ----------
     model_a, model_b:
@@ -41,43 +128,609 @@ def have_conversation(
         responses from each model.
     client:
         Optional client implementing :class:`LLMClient`. If omitted a new
-        :class:`OllamaClient` is created.
+        :class:`OllamaClient` is created and closed before returning.
     system_a, system_b:
-        Optional system prompts prepended to each model's conversation history.
+        Optional system prompts placed at the start of each model's messages.
+    options:
+        Optional model options, such as ``temperature``, passed to every call.
+    window:
+        If given, each model only keeps its system prompt, the initial prompt
+        and the last ``window`` exchanges, i.e. ``2 * window`` messages, which
+        bounds both memory use and the amount of text the model processes per
+        turn. Must be at least ``1``.
+    summary_fn:
+        Optional function called with the lines dropped by ``window`` or
+        ``fit_context``, including any previous summary, returning a short text
+        that replaces them. Without it dropped lines are discarded.
+    fit_context:
+        If true, the tokens of each model's messages are estimated locally
+        with :class:`token_budget.TokenEstimator` and the oldest messages are
+        dropped before a request would exceed the context window, leaving
+        ``RESPONSE_TOKENS`` for the reply. The window size is the ``num_ctx``
+        option, or the client's ``num_ctx`` attribute. :class:`ValueError` is
+        raised when even the newest message does not fit. Requires
+        ``tiktoken``; counts for models without a tiktoken encoding are
+        approximate.
+    preload:
+        If true and the client provides ``preload``, as
+        :class:`OllamaClient` does, both models are loaded before the first
+        turn, in parallel when they differ. Loading them side by side requires
+        the server's ``OLLAMA_MAX_LOADED_MODELS`` to be at least ``2``.
 
     Returns
     -------
-    list of tuple
-        ``(model_name, response)`` pairs in the order produced.
+    list of Turn
+        ``(model, text)`` tuples in the order produced.
     """
 
-    client = cast(LLMClient, client or OllamaClient())
+    owns_client = client is None
+    client = cast(LLMClient, client or _default_client())
+    model_a, model_b = sys.intern(model_a), sys.intern(model_b)
 
-    history: List[Tuple[str, str]] = []
-    history_a: List[str] = []
-    history_b: List[str] = []
-    if system_a:
-        history_a.append(system_a)
-    if system_b:
-        history_b.append(system_b)
-    history_a.append(f"user: {prompt}")
-    history_b.append(f"user: {prompt}")
+    history: List[Turn] = []
+    try:
+        if preload:
+            _preload(client, model_a, model_b, options)
+        token_limit = _context_limit(client, options) if fit_context else None
+        transcript_a = _new_transcript(model_a, system_a, prompt, window, summary_fn, token_limit)
+        transcript_b = _new_transcript(model_b, system_b, prompt, window, summary_fn, token_limit)
 
-    current_model = model_a
-    for _ in range(turns):
-        current_history = history_a if current_model == model_a else history_b
-        response = client.generate(current_model, "\n".join(current_history), stream=False)
-        history.append((current_model, response))
-        line = f"{current_model}: {response}"
-        if current_model == model_a:
-            history_b.append(line)
-        else:
-            history_a.append(line)
-        current_model = model_b if current_model == model_a else model_a
+        speakers = _turn_order(model_a, model_b, transcript_a, transcript_b)
+        for _ in range(turns):
+            current_model, own, other, _ = next(speakers)
+            response = _ask(client, current_model, own, options)
+            history.append(Turn(current_model, response))
+            own.add("assistant", current_model, response)
+            other.add("user", current_model, response)
+    finally:
+        if owns_client:
+            client.close()  # type: ignore[attr-defined]
 
     return history
 
 
+async def ahave_conversation(
+    model_a: str,
+    model_b: str,
+    prompt: str,
+    turns: int = 4,
+    client: AsyncLLMClient | None = None,
+    system_a: str | None = None,
+    system_b: str | None = None,
+    options: Dict[str, object] | None = None,
+    window: int | None = None,
+    summary_fn: Callable[[List[str]], str] | None = None,
+    fit_context: bool = False,
+    speculative: bool = False,
+) -> List[Turn]:
+    """Asynchronous counterpart of :func:`have_conversation`.
+
+    The turns of a single conversation still run one after another because
+    each response depends on the previous one. Awaiting the coroutine however
+    releases the event loop during every request, so several conversations can
+    share a loop; see :func:`ahave_conversations`.
+
+    Parameters are the same as for :func:`have_conversation`, except that
+    ``client`` must implement :class:`AsyncLLMClient`. A client created here is
+    closed before returning.
+
+    With ``speculative`` the current response is streamed, and every time it
+    reaches the end of a sentence the next model's request is started with the
+    text received so far, replacing any earlier speculative request. If the
+    response turns out to end there, the next turn uses the speculative
+    request, whose processing then overlapped with the end of the current one;
+    otherwise it is cancelled. This trades extra server work for latency and
+    only helps with clients that support ``on_token`` streaming, such as
+    :class:`OllamaClient`. A turn answered speculatively does not itself
+    speculate. ``speculative`` is ignored when ``summary_fn`` or
+    ``fit_context`` is set: preparing each speculative request would then run
+    the summary or the token count inside the stream callback, once per
+    sentence.
+    """
+
+    owns_client = client is None
+    client = cast(AsyncLLMClient, client or _default_client())
+    model_a, model_b = sys.intern(model_a), sys.intern(model_b)
+
+    history: List[Turn] = []
+    token_limit = _context_limit(client, options) if fit_context else None
+    transcript_a = _new_transcript(model_a, system_a, prompt, window, summary_fn, token_limit)
+    transcript_b = _new_transcript(model_b, system_b, prompt, window, summary_fn, token_limit)
+    speculative = speculative and summary_fn is None and token_limit is None
+
+    speculation: _Speculation | None = None
+    ready: asyncio.Task[str] | None = None
+    try:
+        speakers = _turn_order(model_a, model_b, transcript_a, transcript_b)
+        for turn in range(turns):
+            current_model, own, other, other_model = next(speakers)
+            if ready is not None:
+                response = await ready
+                ready = None
+            elif speculative and turn + 1 < turns:
+                speculation = _Speculation(client, other_model, other, current_model, options)
+                response = await _aask(
+                    client, current_model, own, options, on_token=speculation.on_token
+                )
+                ready = speculation.resolve(response)
+                speculation = None
+            else:
+                response = await _aask(client, current_model, own, options)
+            history.append(Turn(current_model, response))
+            own.add("assistant", current_model, response)
+            other.add("user", current_model, response)
+    finally:
+        if speculation is not None:
+            speculation.cancel()
+        if ready is not None:
+            ready.cancel()
+        if owns_client:
+            await client.aclose()  # type: ignore[attr-defined]
+
+    return history
+
+
+async def ahave_conversations(
+    prompts: List[str],
+    model_a: str,
+    model_b: str,
+    turns: int = 4,
+    client: AsyncLLMClient | None = None,
+    system_a: str | None = None,
+    system_b: str | None = None,
+    options: Dict[str, object] | None = None,
+    window: int | None = None,
+    summary_fn: Callable[[List[str]], str] | None = None,
+    fit_context: bool = False,
+) -> List[List[Turn]]:
+    """Run one independent conversation per prompt concurrently.
+
+    All conversations are scheduled with :func:`asyncio.gather` on a shared
+    client, so their network round-trips overlap. The achievable speed-up is
+    bounded by how many requests the server processes in parallel; for OLLAMA
+    see the ``OLLAMA_NUM_PARALLEL`` and ``OLLAMA_MAX_LOADED_MODELS`` server
+    settings.
+
+    Returns
+    -------
+    list of list of Turn
+        The history of each conversation, in the same order as ``prompts``.
+    """
+
+    import asyncio
+
+    owns_client = client is None
+    client = cast(AsyncLLMClient, client or _default_client())
+    try:
+        return list(
+            await asyncio.gather(
+                *(
+                    ahave_conversation(
+                        model_a,
+                        model_b,
+                        p,
+                        turns,
+                        client,
+                        system_a,
+                        system_b,
+                        options,
+                        window,
+                        summary_fn,
+                        fit_context,
+                    )
+                    for p in prompts
+                )
+            )
+        )
+    finally:
+        if owns_client:
+            await client.aclose()  # type: ignore[attr-defined]
+
+
+def batch_conversations(
+    prompts: List[str],
+    model_a: str,
+    model_b: str,
+    turns: int = 4,
+    client: object | None = None,
+    system_a: str | None = None,
+    system_b: str | None = None,
+    options: Dict[str, object] | None = None,
+    window: int | None = None,
+    summary_fn: Callable[[List[str]], str] | None = None,
+    fit_context: bool = False,
+    use_batch_api: bool = False,
+) -> List[List[Turn]]:
+    """Run one independent conversation per prompt, advancing all in lockstep.
+
+    With ``use_batch_api`` every turn of every conversation is answered by a
+    single provider batch job through ``client.run_batch``, as provided by
+    :class:`openai_client.OpenAIClient`; ``client`` then defaults to a new
+    :class:`OpenAIClient`. Batch jobs are cheaper but each can take a long
+    time to complete, so this suits offline evaluations rather than
+    interactive use. Otherwise the conversations run concurrently through
+    :func:`ahave_conversations` on a new event loop, so this must not be
+    called from a running one. The asynchronous connections of ``client`` are
+    then closed before returning, since they cannot outlive that loop; the
+    client stays usable and opens new ones when next needed.
+
+    Parameters are the same as for :func:`ahave_conversations`.
+
+    Returns
+    -------
+    list of list of Turn
+        The history of each conversation, in the same order as ``prompts``.
+    """
+
+    if not use_batch_api:
+        import asyncio
+
+        return asyncio.run(
+            _closing(
+                ahave_conversations(
+                    prompts,
+                    model_a,
+                    model_b,
+                    turns,
+                    cast(AsyncLLMClient, client),
+                    system_a,
+                    system_b,
+                    options,
+                    window,
+                    summary_fn,
+                    fit_context,
+                ),
+                client,
+            )
+        )
+
+    if client is None:
+        from openai_client import OpenAIClient
+
+        client = OpenAIClient()
+    run_batch = getattr(client, "run_batch", None)
+    if run_batch is None:
+        raise TypeError("use_batch_api requires a client providing run_batch")
+
+    histories: List[List[Turn]] = [[] for _ in prompts]
+    token_limit = _context_limit(client, options) if fit_context else None
+    speakers = _turn_order(
+        model_a,
+        model_b,
+        [_new_transcript(model_a, system_a, p, window, summary_fn, token_limit) for p in prompts],
+        [_new_transcript(model_b, system_b, p, window, summary_fn, token_limit) for p in prompts],
+    )
+    for _ in range(turns):
+        current_model, own, other, _ = next(speakers)
+        replies = run_batch(current_model, [t.messages for t in own], options=options)
+        for history, own_t, other_t, response in zip(histories, own, other, replies):
+            history.append(Turn(current_model, response))
+            own_t.add("assistant", current_model, response)
+            other_t.add("user", current_model, response)
+
+    return histories
+
+
+async def _closing(coro: Awaitable[S], client: object | None) -> S:
+    """Await ``coro``, then close the asynchronous connections of ``client``."""
+
+    try:
+        return await coro
+    finally:
+        aclose = getattr(client, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def _turn_order(
+    model_a: str, model_b: str, state_a: S, state_b: S
+) -> Iterator[Tuple[str, S, S, str]]:
+    """Yield ``(speaker, speaker state, listener state, listener)`` for each turn.
+
+    Turns alternate by position rather than by comparing model names, so a
+    model can converse with itself.
+    """
+
+    return cycle(((model_a, state_a, state_b, model_b), (model_b, state_b, state_a, model_a)))
+
+
+def _preload(
+    client: LLMClient, model_a: str, model_b: str, options: Dict[str, object] | None
+) -> None:
+    """Load both models through ``client.preload``, concurrently if they differ.
+
+    ``options`` are those of the conversation, so the models are loaded with
+    the context size the turns will use.
+    """
+
+    preload = getattr(client, "preload", None)
+    if preload is None:
+        return
+    if model_a == model_b:
+        preload(model_a, options=options)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda model: preload(model, options=options), (model_a, model_b)))
+
+
+def _context_limit(client: object, options: Dict[str, object] | None) -> int:
+    """Return the tokens available for a prompt sent through ``client``."""
+
+    num_ctx = (options or {}).get("num_ctx") or getattr(client, "num_ctx", None)
+    if num_ctx is None:
+        raise ValueError("fit_context requires a num_ctx option or a client with num_ctx")
+    return int(cast(int, num_ctx)) - RESPONSE_TOKENS
+
+
+def _new_transcript(
+    model: str,
+    system: str | None,
+    prompt: str,
+    window: int | None,
+    summary_fn: Callable[[List[str]], str] | None,
+    token_limit: int | None,
+) -> _Transcript:
+    """Create the transcript of ``model``, counting its tokens if ``token_limit`` is set."""
+
+    count_tokens = TokenEstimator(model).count if token_limit is not None else None
+    return _Transcript(system, prompt, window, summary_fn, token_limit, count_tokens)
+
+
+def _default_client() -> OllamaClient:
+    """Return a new :class:`OllamaClient`, importing it only when needed."""
+
+    from ollama_client import OllamaClient
+
+    return OllamaClient()
+
+
+class _Transcript:
+    """The conversation as seen by one participant.
+
+    The system prompt and the initial prompt form a static prefix that is
+    never modified or dropped, so every request starts with the same bytes and
+    the server's prompt cache can skip reprocessing it. Later entries are kept
+    both as chat messages and as the lines that represent them in a plain
+    prompt. Lines are rendered once when added, so building the prompt for
+    clients without ``chat`` is a single join rather than re-formatting the
+    whole conversation each turn.
+
+    When ``window`` is set older entries are dropped as described for
+    :func:`have_conversation`. When ``token_limit`` is set the estimated size
+    of the conversation, counted with ``count_tokens``, is kept within it by
+    dropping the oldest entries the same way. Counts are computed once per
+    entry as it is added.
+    """
+
+    def __init__(
+        self,
+        system: str | None,
+        prompt: str,
+        window: int | None = None,
+        summary_fn: Callable[[List[str]], str] | None = None,
+        token_limit: int | None = None,
+        count_tokens: Callable[[str], int] | None = None,
+    ) -> None:
+        if window is not None and window < 1:
+            raise ValueError(f"window must be at least 1, got {window}")
+        self.messages: List[Message] = []
+        if system:
+            self.messages.append({"role": "system", "content": system})
+        self.messages.append({"role": "user", "content": prompt})
+        self.static_prefix = f"{system}\nuser: {prompt}" if system else f"user: {prompt}"
+        self.lines: List[str] = []
+        self.window = window
+        self.summary_fn = summary_fn
+        self.token_limit = token_limit
+        self.count_tokens = count_tokens
+        self._pinned = len(self.messages)
+        self._summarised = False
+        # Estimated tokens of each entry of ``lines`` and of the whole conversation.
+        self._tokens: List[int] = []
+        self._total_tokens = sum(self._estimate(m["content"]) for m in self.messages)
+        if token_limit is not None:
+            self._fit(token_limit)
+
+    def add(self, role: str, author: str, content: str) -> None:
+        """Append a message with ``role`` written by ``author``."""
+
+        self._insert(len(self.lines), role, content, f"{author}: {content}")
+        if self.window is not None:
+            self._trim(self.window)
+        if self.token_limit is not None:
+            self._fit(self.token_limit)
+
+    def _insert(self, index: int, role: str, content: str, line: str) -> None:
+        """Insert an entry at position ``index`` of the entries after the prefix."""
+
+        self.messages.insert(self._pinned + index, {"role": role, "content": content})
+        self.lines.insert(index, line)
+        tokens = self._estimate(content)
+        self._tokens.insert(index, tokens)
+        self._total_tokens += tokens
+
+    def _estimate(self, content: str) -> int:
+        """Return the estimated tokens of a message, or ``0`` when not counting."""
+
+        if self.count_tokens is None:
+            return 0
+        return self.count_tokens(content) + MESSAGE_OVERHEAD
+
+    def _trim(self, window: int) -> None:
+        """Drop entries older than the last ``window`` exchanges."""
+
+        end = len(self.lines) - 2 * window
+        if end - self._summarised > 0:
+            self._drop(end)
+
+    def _fit(self, limit: int) -> None:
+        """Drop the oldest entries until the conversation fits in ``limit`` tokens.
+
+        With ``summary_fn`` the dropped entries are replaced by their summary.
+        When the summary itself does not fit, more entries are dropped and
+        summarised together with it, until the conversation fits or only the
+        summary and the newest entry are left; only then is the summary
+        dropped. The newest entry is always kept. :class:`ValueError` is
+        raised if the conversation does not fit even then, so that an
+        over-long request is never sent.
+        """
+
+        while self._total_tokens > limit and len(self.lines) > 1 + self._summarised:
+            excess = self._total_tokens - limit
+            end = freed = 0
+            while freed < excess and end < len(self.lines) - 1:
+                freed += self._tokens[end]
+                end += 1
+            # An existing summary is re-summarised with at least one more entry.
+            self._drop(max(end, 1 + self._summarised))
+        if self._total_tokens > limit and self._summarised:
+            self._drop(1, summarise=False)
+        if self._total_tokens > limit:
+            raise ValueError(
+                f"The conversation needs about {self._total_tokens} tokens, "
+                f"more than the {limit} available"
+            )
+
+    def _drop(self, end: int, summarise: bool = True) -> None:
+        """Remove the first ``end`` entries after the prefix, summarising them if possible."""
+
+        dropped = self.lines[:end]
+        del self.messages[self._pinned : self._pinned + end]
+        del self.lines[:end]
+        self._total_tokens -= sum(self._tokens[:end])
+        del self._tokens[:end]
+        self._summarised = False
+        if summarise and self.summary_fn is not None:
+            summary = self.summary_fn(dropped)
+            self._insert(0, "system", summary, summary)
+            self._summarised = True
+
+    def copy(self) -> _Transcript:
+        """Return an independent copy that can be extended separately."""
+
+        clone = copy.copy(self)
+        clone.messages = list(self.messages)
+        clone.lines = list(self.lines)
+        clone._tokens = list(self._tokens)
+        return clone
+
+    def prompt(self) -> str:
+        """Return the conversation as a single prompt string."""
+
+        if not self.lines:
+            return self.static_prefix
+        return self.static_prefix + "\n" + "\n".join(self.lines)
+
+
+def _ask(
+    client: LLMClient,
+    model: str,
+    transcript: _Transcript,
+    options: Dict[str, object] | None,
+) -> str:
+    """Request the next reply of ``model`` using ``chat`` when available."""
+
+    chat = getattr(client, "chat", None)
+    if chat is not None:
+        return chat(model, transcript.messages, stream=False, options=options)
+    return client.generate(model, transcript.prompt(), stream=False, options=options)
+
+
+async def _aask(
+    client: AsyncLLMClient,
+    model: str,
+    transcript: _Transcript,
+    options: Dict[str, object] | None,
+    on_token: Callable[[str], None] | None = None,
+) -> str:
+    """Asynchronous counterpart of :func:`_ask`.
+
+    ``on_token`` is passed on to clients that stream responses.
+    """
+
+    kwargs: Dict[str, object] = {"options": options}
+    if on_token is not None:
+        kwargs["on_token"] = on_token
+    achat = getattr(client, "achat", None)
+    if achat is not None:
+        return await achat(model, transcript.messages, stream=False, **kwargs)
+    return await client.agenerate(model, transcript.prompt(), stream=False, **kwargs)
+
+
+class _Speculation:
+    """Speculative request for the next reply, started while the current one streams.
+
+    :meth:`on_token` receives the current response as it arrives. At every
+    sentence boundary it cancels the previous speculative request and starts
+    a new one for ``model``, as if the response ended there.
+    :meth:`resolve` then keeps the request whose assumption was right.
+    ``transcript`` is copied and extended at every boundary, so it must not
+    summarise or count tokens; see :func:`ahave_conversation`.
+    """
+
+    def __init__(
+        self,
+        client: AsyncLLMClient,
+        model: str,
+        transcript: _Transcript,
+        author: str,
+        options: Dict[str, object] | None,
+    ) -> None:
+        self.client = client
+        self.model = model
+        self.transcript = transcript
+        self.author = author
+        self.options = options
+        self._parts: List[str] = []
+        self._task: asyncio.Task[str] | None = None
+        self._text: str | None = None
+
+    def on_token(self, token: str) -> None:
+        """Record ``token`` and speculate if it ends a sentence."""
+
+        self._parts.append(token)
+        if not _SENTENCE_END.search(token):
+            return
+        import asyncio
+
+        self.cancel()
+        self._text = "".join(self._parts)
+        transcript = self.transcript.copy()
+        transcript.add("user", self.author, self._text)
+        self._task = asyncio.ensure_future(
+            _aask(self.client, self.model, transcript, self.options)
+        )
+        self._task.add_done_callback(_consume_result)
+
+    def resolve(self, response: str) -> asyncio.Task[str] | None:
+        """Return the speculative request if it assumed ``response``, else cancel it."""
+
+        if self._task is not None and self._text == response:
+            return self._task
+        self.cancel()
+        return None
+
+    def cancel(self) -> None:
+        """Cancel the outstanding speculative request, if any."""
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# A sentence ends with terminal punctuation or a line break, possibly followed by spaces.
+_SENTENCE_END = re.compile(r"[.!?\n]\s*$")
+
+
+def _consume_result(task: asyncio.Task[str]) -> None:
+    """Retrieve the outcome of a speculative task so abandoned failures are not logged."""
+
+    if not task.cancelled():
+        task.exception()
+
+
 def main() -> None:
     import argparse
 
@@ -86,9 +739,14 @@ def main() -> None:
     parser.add_argument("--model-a", default="llama2", help="Name of the first model")
     parser.add_argument("--model-b", default="llama2", help="Name of the second model")
     parser.add_argument("--turns", type=int, default=4, help="Number of turns in the conversation")
+    parser.add_argument(
+        "--preload", action="store_true", help="Load both models before the first turn"
+    )
     args = parser.parse_args()
 
-    history = have_conversation(args.model_a, args.model_b, args.prompt, args.turns)
+    history = have_conversation(
+        args.model_a, args.model_b, args.prompt, args.turns, preload=args.preload
+    )
     for model, text in history:
         print(f"{model}: {text}")
 
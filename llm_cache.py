@@ -0,0 +1,669 @@
+"""Client wrappers that reuse earlier responses instead of calling the model."""
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:  # pragma: no cover - imported lazily by SemanticCache
+    import faiss
+
+# Stored values are ``(expiry timestamp or None, response)`` pairs.
+Entry = Tuple[Optional[float], str]
+
+
+class LRUDict(OrderedDict):
+    """In-memory mapping that discards the least recently used entry when full.
+
+    Parameters
+    ----------
+    maxsize:
+        Maximum number of entries kept. ``None`` disables the limit.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1024) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key: str) -> Entry:
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key: str, default: Optional[Entry] = None) -> Optional[Entry]:
+        if key not in self:
+            return default
+        return self[key]
+
+    def __setitem__(self, key: str, value: Entry) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if self.maxsize is not None and len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class _ClientWrapper:
+    """Base class for wrappers that forward everything they do not override."""
+
+    def __init__(self, inner: object, only_deterministic: bool) -> None:
+        self.inner = inner
+        self.only_deterministic = only_deterministic
+        # Only expose the methods the inner client implements, so callers
+        # probing for ``chat`` or ``achat`` see the same capabilities. An inner
+        # wrapper may itself have masked a method by setting it to ``None``.
+        for name in ("chat", "agenerate", "achat"):
+            if getattr(inner, name, None) is None:
+                setattr(self, name, None)
+
+    def __getattr__(self, name: str) -> object:
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def _cacheable(self, kwargs: Dict[str, object]) -> bool:
+        """Return whether a request made with ``kwargs`` may use the cache."""
+
+        options: Dict[str, object] = kwargs.get("options") or {}  # type: ignore[assignment]
+        return not (self.only_deterministic and options.get("temperature", 0) > 0)  # type: ignore
+
+
+class CachingClient(_ClientWrapper):
+    """Wrap a client so identical requests are answered from a cache.
+
+    A request is identified by the SHA-256 hash of its model, its prompt or
+    messages, and its options. Wrapping is transparent: pass the wrapper
+    wherever the inner client would be used, for example
+    ``have_conversation(..., client=CachingClient(OllamaClient()))``. Methods
+    and attributes other than the generation methods are forwarded to the
+    inner client.
+
+    Parameters
+    ----------
+    inner:
+        Client performing the actual requests.
+    backend:
+        Mutable mapping storing the responses. Defaults to an in-memory
+        :class:`LRUDict`. A ``diskcache.Cache`` instance can be passed to keep
+        responses across runs.
+    ttl:
+        Optional lifetime of an entry in seconds.
+    only_deterministic:
+        When true, requests whose ``temperature`` option is above zero are
+        neither looked up nor stored, since repeating them is expected to give
+        a different answer.
+    """
+
+    def __init__(
+        self,
+        inner: object,
+        backend: MutableMapping[str, Entry] | None = None,
+        ttl: float | None = None,
+        only_deterministic: bool = True,
+    ) -> None:
+        super().__init__(inner, only_deterministic)
+        self.backend: MutableMapping[str, Entry] = LRUDict() if backend is None else backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def generate(self, model: str, prompt: str, stream: bool = False, **kwargs: object) -> str:
+        """Return the cached completion for ``prompt`` or generate a new one."""
+
+        key = self._key(model, kwargs, prompt=prompt)
+        response = self._lookup(key)
+        if response is None:
+            response = self.inner.generate(model, prompt, stream, **kwargs)  # type: ignore
+            self._store(key, response)
+        return response
+
+    def chat(
+        self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs: object
+    ) -> str:
+        """Return the cached reply to ``messages`` or request a new one."""
+
+        key = self._key(model, kwargs, messages=messages)
+        response = self._lookup(key)
+        if response is None:
+            response = self.inner.chat(model, messages, stream, **kwargs)  # type: ignore
+            self._store(key, response)
+        return response
+
+    async def agenerate(
+        self, model: str, prompt: str, stream: bool = False, **kwargs: object
+    ) -> str:
+        """Asynchronous counterpart of :meth:`generate`."""
+
+        key = self._key(model, kwargs, prompt=prompt)
+        response = self._lookup(key)
+        if response is None:
+            response = await self.inner.agenerate(model, prompt, stream, **kwargs)  # type: ignore
+            self._store(key, response)
+        return response
+
+    async def achat(
+        self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs: object
+    ) -> str:
+        """Asynchronous counterpart of :meth:`chat`."""
+
+        key = self._key(model, kwargs, messages=messages)
+        response = self._lookup(key)
+        if response is None:
+            response = await self.inner.achat(model, messages, stream, **kwargs)  # type: ignore
+            self._store(key, response)
+        return response
+
+    def _key(self, model: str, kwargs: Dict[str, object], **request: object) -> str | None:
+        """Return the cache key of a request, or ``None`` if it must not be cached."""
+
+        if not self._cacheable(kwargs):
+            return None
+        options = kwargs.get("options") or {}
+        blob = json.dumps({"model": model, **request, "options": options}, sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _lookup(self, key: str | None) -> str | None:
+        """Return the stored response for ``key`` if present and not expired."""
+
+        if key is None:
+            return None
+        entry = self.backend.get(key)
+        if entry is not None:
+            expires, response = entry
+            if expires is None or expires > time.time():
+                self.hits += 1
+                return response
+            del self.backend[key]
+        self.misses += 1
+        return None
+
+    def _store(self, key: str | None, response: str) -> None:
+        """Remember ``response`` under ``key`` when caching is allowed."""
+
+        if key is None:
+            return
+        expires = None if self.ttl is None else time.time() + self.ttl
+        self.backend[key] = (expires, response)
+
+
+class SemanticCache(_ClientWrapper):
+    """Wrap a client so requests similar to an earlier one reuse its response.
+
+    Each prompt, or the last message for ``chat``, is embedded and compared
+    with the embeddings of earlier requests for the same model and options
+    using a FAISS inner-product index over L2-normalised vectors, i.e. cosine
+    similarity. When the closest earlier request is more than ``threshold``
+    similar its response is returned instead of calling the model. This
+    catches paraphrases such as "capital of France" and "France's capital"
+    that :class:`CachingClient` misses, at the cost of one embedding request
+    per call. Asynchronous methods of the inner client are forwarded without
+    caching.
+
+    For ``chat`` the messages before the last one must match exactly. Two
+    turns of the same conversation share most of their text, so comparing
+    whole transcripts would return a model's previous reply again.
+
+    Requires the ``faiss`` and ``numpy`` packages.
+
+    Parameters
+    ----------
+    inner:
+        Client performing the actual requests.
+    embed:
+        Function returning the embedding of a text. Defaults to calling
+        ``inner.embed(embed_model, text)``, as provided by
+        :class:`ollama_client.OllamaClient`.
+    embed_model:
+        Model used by the default ``embed`` function.
+    threshold:
+        Cosine similarity a cached response must exceed to be reused.
+    ttl:
+        Optional lifetime of an entry in seconds.
+    max_entries:
+        Maximum number of responses kept; the least recently used is evicted.
+    only_deterministic:
+        As for :class:`CachingClient`.
+    """
+
+    def __init__(
+        self,
+        inner: object,
+        embed: Callable[[str], Sequence[float]] | None = None,
+        embed_model: str = "nomic-embed-text",
+        threshold: float = 0.92,
+        ttl: float | None = None,
+        max_entries: int = 1024,
+        only_deterministic: bool = True,
+    ) -> None:
+        # Imported here so that the other caches do not pay for loading them.
+        try:
+            import faiss  # noqa: F401
+            import numpy  # noqa: F401
+        except ImportError as exc:  # pragma: no cover - optional dependency missing
+            raise ImportError(
+                "The 'faiss' and 'numpy' packages are required for SemanticCache"
+            ) from exc
+        super().__init__(inner, only_deterministic)
+        if embed is None:
+
+            def embed(text: str) -> Sequence[float]:
+                return inner.embed(embed_model, text)  # type: ignore[attr-defined]
+
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._next_id = 0
+        # One index per (model, options, earlier messages) so that only
+        # comparable requests match.
+        self._indexes: Dict[str, "faiss.Index"] = {}
+        # Entry id -> (index key, expiry timestamp or None, response), oldest first.
+        self._entries: "OrderedDict[int, Tuple[str, Optional[float], str]]" = OrderedDict()
+
+    def generate(self, model: str, prompt: str, stream: bool = False, **kwargs: object) -> str:
+        """Return a cached completion for a similar prompt or generate a new one."""
+
+        return self._cached(
+            model,
+            prompt,
+            kwargs,
+            lambda: self.inner.generate(model, prompt, stream, **kwargs),  # type: ignore
+        )
+
+    def chat(
+        self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs: object
+    ) -> str:
+        """Return a cached reply to a similar last message or request a new one."""
+
+        def call() -> str:
+            return self.inner.chat(model, messages, stream, **kwargs)  # type: ignore
+
+        if not messages:
+            return call()
+        return self._cached(model, messages[-1]["content"], kwargs, call, messages[:-1])
+
+    def _cached(
+        self,
+        model: str,
+        text: str,
+        kwargs: Dict[str, object],
+        call: Callable[[], str],
+        context: List[Dict[str, str]] | None = None,
+    ) -> str:
+        """Look ``text`` up in the index for ``model`` and ``context``, else use ``call``."""
+
+        import faiss
+        import numpy as np
+
+        if not self._cacheable(kwargs):
+            return call()
+        options = kwargs.get("options") or {}
+        context_hash = hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+        index_key = json.dumps(
+            {"model": model, "options": options, "context": context_hash}, sort_keys=True
+        )
+        vector = np.asarray(self.embed(text), dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+
+        index = self._indexes.get(index_key)
+        if index is not None and index.ntotal:
+            scores, ids = index.search(vector, 1)
+            entry_id = int(ids[0][0])
+            if scores[0][0] > self.threshold and entry_id in self._entries:
+                _, expires, response = self._entries[entry_id]
+                if expires is None or expires > time.time():
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return response
+                self._evict(entry_id)
+        self.misses += 1
+
+        response = call()
+        # Evicting an expired entry above may have removed the index.
+        index = self._indexes.get(index_key)
+        if index is None:
+            index = self._indexes[index_key] = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+        entry_id = self._next_id
+        self._next_id += 1
+        index.add_with_ids(vector, np.asarray([entry_id], dtype="int64"))
+        expires = None if self.ttl is None else time.time() + self.ttl
+        self._entries[entry_id] = (index_key, expires, response)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+        return response
+
+    def _evict(self, entry_id: int) -> None:
+        """Remove an entry and its embedding."""
+
+        import numpy as np
+
+        index_key, _, _ = self._entries.pop(entry_id)
+        index = self._indexes[index_key]
+        index.remove_ids(np.asarray([entry_id], dtype="int64"))
+        if not index.ntotal:
+            del self._indexes[index_key]
+
+
+class GenerativeCache(_ClientWrapper):
+    """Wrap a client so prompts built from the same template share responses.
+
+    Prompts such as ``"Translate 'cat' to French"`` and ``"Translate 'dog' to
+    French"`` differ only in a few slots and are missed by both other caches.
+    Each new prompt is compared word by word with earlier prompts for the same
+    model and options. If it differs from one of them only by replacing at
+    most ``max_slots`` spans of at most ``max_slot_tokens`` tokens each, and
+    the two share at least ``min_shared_words`` words, the earlier response is
+    adapted instead of calling the model:
+
+    * with ``substitute``, when every replaced span of the earlier prompt
+      appears in the earlier response as whole words, those occurrences are
+      substituted with the new values. This is only correct for deterministic
+      templates whose response merely echoes the slots, such as a form letter;
+      a factual answer would keep facts about the old value ("The capital of
+      Spain is Paris."), which is why it is off by default. Spans shorter than
+      ``min_slot_chars`` or containing digits, and new values already present
+      in the response, are never substituted;
+    * otherwise, if ``rewrite_model`` is set, that (ideally small and fast)
+      model is asked to rewrite the earlier response for the new prompt.
+
+    When neither applies the request goes to the inner client as usual, so by
+    default only exact repeats and ``rewrite_model`` rewrites are served from
+    the cache. Asynchronous methods of the inner client are forwarded without
+    caching.
+
+    Parameters
+    ----------
+    inner:
+        Client performing the actual requests.
+    max_slots:
+        Maximum number of differing spans for two prompts to share a template.
+    min_shared_words:
+        Minimum number of words the two prompts must have in common.
+    max_slot_tokens:
+        Maximum length of a differing span, counting words, spaces and
+        punctuation marks. Together with ``max_slots`` it bounds the part of
+        two prompts that is compared word by word, which keeps lookups cheap
+        for long prompts.
+    substitute:
+        Whether responses may be adapted by substituting the slot values.
+    min_slot_chars:
+        Minimum length of the old and new value of a span for its response to
+        be adapted by substitution.
+    rewrite_model:
+        Optional model used to adapt responses that cannot be substituted.
+    max_entries:
+        Maximum number of responses kept; the least recently used is evicted.
+    only_deterministic:
+        As for :class:`CachingClient`.
+    """
+
+    def __init__(
+        self,
+        inner: object,
+        max_slots: int = 2,
+        min_shared_words: int = 4,
+        max_slot_tokens: int = 32,
+        substitute: bool = False,
+        min_slot_chars: int = 3,
+        rewrite_model: str | None = None,
+        max_entries: int = 256,
+        only_deterministic: bool = True,
+    ) -> None:
+        super().__init__(inner, only_deterministic)
+        self.max_slots = max_slots
+        self.min_shared_words = min_shared_words
+        self.max_slot_tokens = max_slot_tokens
+        self.substitute = substitute
+        self.min_slot_chars = min_slot_chars
+        self.rewrite_model = rewrite_model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # (model and options key, prompt) -> (prompt tokens, response), oldest first.
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[str], str]]" = OrderedDict()
+
+    def generate(self, model: str, prompt: str, stream: bool = False, **kwargs: object) -> str:
+        """Return an adapted cached completion or generate a new one."""
+
+        return self._cached(
+            model,
+            prompt,
+            kwargs,
+            lambda: self.inner.generate(model, prompt, stream, **kwargs),  # type: ignore
+        )
+
+    def chat(
+        self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs: object
+    ) -> str:
+        """Return an adapted cached reply or request a new one."""
+
+        return self._cached(
+            model,
+            _messages_text(messages),
+            kwargs,
+            lambda: self.inner.chat(model, messages, stream, **kwargs),  # type: ignore
+        )
+
+    def _cached(
+        self, model: str, text: str, kwargs: Dict[str, object], call: Callable[[], str]
+    ) -> str:
+        """Answer ``text`` from a matching template or fall back to ``call``."""
+
+        if not self._cacheable(kwargs):
+            return call()
+        options = kwargs.get("options") or {}
+        group = json.dumps({"model": model, "options": options}, sort_keys=True)
+        key = (group, text)
+        tokens = _TOKEN_RE.findall(text)
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+        # Without a way to adapt a response there is no point looking for a template.
+        candidates = self._entries.items() if self.substitute or self.rewrite_model else ()
+        diffs = 0
+        for (entry_group, entry_text), (entry_tokens, response) in reversed(candidates):
+            if diffs >= _MAX_DIFFS:
+                break
+            if entry_group != group:
+                continue
+            middles = self._middles(entry_tokens, tokens)
+            if middles is None:
+                continue
+            diffs += 1
+            slots = self._slots(entry_tokens, tokens, middles)
+            if slots is None:
+                continue
+            adapted = self._adapt(entry_text, text, response, slots)
+            if adapted is not None:
+                self._entries.move_to_end((entry_group, entry_text))
+                self.hits += 1
+                return adapted
+        self.misses += 1
+
+        response = call()
+        self._entries[key] = (tokens, response)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return response
+
+    def _middles(self, old: List[str], new: List[str]) -> Tuple[int, int] | None:
+        """Return the lengths of the prefix and suffix shared by two prompts.
+
+        ``None`` is returned when the tokens between them are too many to
+        form at most ``max_slots`` spans of ``max_slot_tokens``, or when one
+        prompt extends the other. This is linear in the prompt length and
+        rejects most unrelated prompts before the word by word comparison.
+        """
+
+        limit = len(old) if len(old) < len(new) else len(new)
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+            suffix += 1
+        old_size = len(old) - prefix - suffix
+        new_size = len(new) - prefix - suffix
+        bound = self.max_slots * self.max_slot_tokens
+        if not 0 < old_size <= bound or not 0 < new_size <= bound:
+            return None
+        return prefix, suffix
+
+    def _slots(
+        self, old: List[str], new: List[str], middles: Tuple[int, int] | None = None
+    ) -> List[Tuple[str, str]] | None:
+        """Return the ``(old, new)`` spans in which two prompts differ.
+
+        ``None`` is returned when the prompts do not share a template: they
+        differ by insertions or deletions, by too many or too long spans, or
+        have too few words in common. ``middles`` is the result of
+        :meth:`_middles`, computed here when not given.
+        """
+
+        if middles is None:
+            middles = self._middles(old, new)
+            if middles is None:
+                return None
+        prefix, suffix = middles
+        shared = _word_count(old[:prefix]) + _word_count(old[len(old) - suffix :])
+        old_middle = old[prefix : len(old) - suffix]
+        new_middle = new[prefix : len(new) - suffix]
+        matcher = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+        # [i1, i2, j1, j2] bounds of each differing span in the two middles.
+        spans: List[List[int]] = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                words = _word_count(old_middle[i1:i2])
+                if words == 0 and spans and spans[-1][1] == i1:
+                    # Only a space separates two replaced words: one multi-word span.
+                    spans[-1][1], spans[-1][3] = i2, j2
+                shared += words
+            elif tag != "replace":
+                return None
+            elif spans and spans[-1][1] == i1 and spans[-1][3] == j1:
+                spans[-1][1], spans[-1][3] = i2, j2
+            else:
+                spans.append([i1, i2, j1, j2])
+        if not spans or len(spans) > self.max_slots or shared < self.min_shared_words:
+            return None
+        slots: List[Tuple[str, str]] = []
+        for i1, i2, j1, j2 in spans:
+            if i2 - i1 > self.max_slot_tokens or j2 - j1 > self.max_slot_tokens:
+                return None
+            old_value = "".join(old_middle[i1:i2]).strip()
+            new_value = "".join(new_middle[j1:j2]).strip()
+            if not old_value or not new_value:
+                return None
+            slots.append((old_value, new_value))
+        return slots
+
+    def _adapt(
+        self, old_text: str, new_text: str, response: str, slots: List[Tuple[str, str]]
+    ) -> str | None:
+        """Adapt ``response`` from ``old_text`` to ``new_text``, if confident."""
+
+        if self.substitute and self._substitutable(slots, response):
+            adapted = _substitute(response, slots)
+            if adapted is not None:
+                return adapted
+        if self.rewrite_model is None:
+            return None
+        instruction = (
+            "The request below was answered with the response below.\n\n"
+            f"Request:\n{old_text}\n\nResponse:\n{response}\n\n"
+            "Rewrite the response so that it answers this new request instead, "
+            "keeping its structure and changing only what depends on the request. "
+            f"Reply with the rewritten response only.\n\nNew request:\n{new_text}"
+        )
+        return self.inner.generate(  # type: ignore[attr-defined]
+            self.rewrite_model, instruction, options={"temperature": 0}
+        )
+
+    def _substitutable(self, slots: List[Tuple[str, str]], response: str) -> bool:
+        """Return whether substituting ``slots`` in ``response`` can be trusted.
+
+        Short spans and numbers are rejected because the response usually
+        depends on their value in ways substitution cannot follow, and so are
+        new values already present in the response, which would make it
+        ambiguous.
+        """
+
+        tokens = _TOKEN_RE.findall(response)
+        for old, new in slots:
+            for value in (old, new):
+                if len(value) < self.min_slot_chars or any(c.isdigit() for c in value):
+                    return False
+            if _find_tokens(tokens, _TOKEN_RE.findall(new)):
+                return False
+        return True
+
+
+# Words and the whitespace between them, so that joining tokens restores the text.
+_TOKEN_RE = re.compile(r"\s+|\w+|[^\w\s]")
+
+# Most earlier prompts compared word by word with a new one per lookup.
+_MAX_DIFFS = 8
+
+
+def _word_count(tokens: List[str]) -> int:
+    """Return the number of tokens that are not whitespace."""
+
+    return sum(1 for t in tokens if not t.isspace())
+
+
+def _find_tokens(tokens: List[str], needle: List[str]) -> bool:
+    """Return whether ``needle`` occurs in ``tokens`` as a run of whole tokens."""
+
+    size = len(needle)
+    return any(tokens[i : i + size] == needle for i in range(len(tokens) - size + 1))
+
+
+def _substitute(response: str, slots: List[Tuple[str, str]]) -> str | None:
+    """Replace every whole-token occurrence of each old slot value in ``response``.
+
+    Returns ``None`` unless every old value occurs at least once.
+    """
+
+    tokens = _TOKEN_RE.findall(response)
+    # Longest first, so that a value containing another one wins.
+    needles = sorted(
+        ((_TOKEN_RE.findall(old), new) for old, new in slots), key=lambda n: -len(n[0])
+    )
+    found = set()
+    parts: List[str] = []
+    i = 0
+    while i < len(tokens):
+        for n, (needle, new) in enumerate(needles):
+            if tokens[i : i + len(needle)] == needle:
+                parts.append(new)
+                found.add(n)
+                i += len(needle)
+                break
+        else:
+            parts.append(tokens[i])
+            i += 1
+    if len(found) < len(needles):
+        return None
+    return "".join(parts)
+
+
+def _messages_text(messages: List[Dict[str, str]]) -> str:
+    """Return chat messages as one text for comparison with other requests."""
+
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
@@ -1,13 +1,37 @@
 """Client utilities for interacting with a local OLLAMA server."""
 from __future__ import annotations
 
+import json
 import os
-from typing import List, Dict, Optional
+import random
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    List,
+    Dict,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from types import TracebackType
 
-try:  # pragma: no cover - import is trivial
-    import requests  # type: ignore
-except Exception:  # pragma: no cover - handled in generate
-    requests = None  # type: ignore
+try:  # pragma: no cover - optional speed-up
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - fall back to the standard library
+    orjson = None  # type: ignore
+
+if TYPE_CHECKING:  # pragma: no cover - imported lazily at runtime
+    import aiohttp
+    import requests
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+T = TypeVar("T")
 
 
 class OllamaClient:
@@ -19,19 +43,86 @@ class OllamaClient:
         URL where the OLLAMA server is accessible. If omitted the constructor
         reads the ``OLLAMA_HOST`` environment variable and falls back to
         ``"http://localhost:11434"`` when the variable is not set.
+    num_ctx:
+        Context window size, in tokens, requested for every call.
+    keep_alive:
+        How long the server keeps a model loaded after a request, using
+        OLLAMA's duration syntax such as ``"30m"``.
+    max_parallel:
+        Maximum number of concurrent connections used by the asynchronous
+        methods. Defaults to the ``OLLAMA_NUM_PARALLEL`` environment variable,
+        or ``4`` when it is not set, so that the client never queues more
+        requests than the server processes at once.
+    connect_timeout, read_timeout:
+        Seconds to wait for a connection, and between bytes of the reply.
+    max_retries:
+        How many times a request is retried, with exponential backoff, after a
+        transient failure such as a connection error or a ``429``/``5xx``
+        reply. Failures after the server may have started generating are only
+        retried for idempotent requests; see ``idempotent`` in :meth:`generate`.
+        A ``Retry-After`` header of more than a minute fails the request
+        instead of waiting.
+
+    The synchronous methods share a :class:`requests.Session`, so consecutive
+    calls reuse the same keep-alive connection instead of opening a new one per
+    request. Use the client as a context manager, or call :meth:`close`, to
+    release the connections.
     """
 
-    def __init__(self, base_url: str | None = None) -> None:
+    def __init__(
+        self,
+        base_url: str | None = None,
+        num_ctx: int = 4096,
+        keep_alive: str = "30m",
+        max_parallel: int | None = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+    ) -> None:
         if base_url is None:
             base_url = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
         self.base_url = base_url.rstrip("/")
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        if max_parallel is None:
+            max_parallel = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+        self.max_parallel = max_parallel
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self._async_session: Optional["aiohttp.ClientSession"] = None
+        self._session: Optional["requests.Session"] = None
+        self._session_lock = threading.Lock()
+
+    def __enter__(self) -> "OllamaClient":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections held by the synchronous session."""
+
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def generate(
         self,
         model: str,
         prompt: str,
         stream: bool = False,
-        **kwargs: object,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **_: object,
     ) -> str:
         """Generate a completion from a model using the /api/generate endpoint.
 
@@ -42,31 +133,563 @@ class OllamaClient:
         prompt:
             Prompt text to send to the model.
         stream:
-            Whether to use streaming responses. Streaming is disabled by default
-            because this client collects the full response before returning.
-        kwargs:
-            Additional keyword arguments.
-            options:
-                Additional options passed directly to the API.
-            timeout:
-                Timeout for the HTTP request in seconds. Defaults to 60.
+            Whether the server streams the response in chunks. The chunks are
+            joined, so the full response is returned either way. Streaming is
+            enabled automatically when ``on_token`` is given.
+        options:
+            Additional options passed directly to the API.
+        timeout:
+            Read timeout for the HTTP request in seconds. Defaults to
+            :attr:`read_timeout`.
+        idempotent:
+            Whether the request may be retried after failures that could
+            happen once the server started generating. Defaults to true only
+            when ``options`` sets ``temperature`` to ``0``.
+        on_token:
+            Callable invoked with each chunk of text as soon as it is
+            received, e.g. to display the response while it is generated.
+        """
+
+        payload = self._payload(
+            model,
+            stream or on_token is not None,
+            options,
+            prompt=prompt,
+            keep_alive=self.keep_alive,
+        )
+        timeout = self.read_timeout if timeout is None else timeout
+        idempotent = _idempotent(idempotent, options)
+        if payload["stream"]:
+            return self._post_stream(
+                "/api/generate", payload, timeout, idempotent, _generate_text, on_token
+            )
+        return _generate_text(self._post("/api/generate", payload, timeout, idempotent))
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **_: object,
+    ) -> str:
+        """Generate the next assistant message using the /api/chat endpoint.
+
+        Unlike :meth:`generate`, the conversation is sent as structured
+        ``{"role": ..., "content": ...}`` messages. The server keeps the model
+        loaded for :attr:`keep_alive` and can reuse its cache for a prefix of
+        ``messages`` that is identical to the previous call, so appending to the
+        same list between calls avoids reprocessing the whole conversation.
+
+        Parameters
+        ----------
+        model:
+            The name of the model to query.
+        messages:
+            Conversation so far, oldest message first.
+        stream, options, timeout, idempotent, on_token:
+            As for :meth:`generate`.
+        """
+
+        payload = self._payload(
+            model,
+            stream or on_token is not None,
+            options,
+            messages=messages,
+            keep_alive=self.keep_alive,
+        )
+        timeout = self.read_timeout if timeout is None else timeout
+        idempotent = _idempotent(idempotent, options)
+        if payload["stream"]:
+            return self._post_stream(
+                "/api/chat", payload, timeout, idempotent, _chat_text, on_token
+            )
+        return _chat_text(self._post("/api/chat", payload, timeout, idempotent))
+
+    def embed(
+        self, model: str, text: str, *, timeout: Optional[float] = None, **_: object
+    ) -> List[float]:
+        """Return the embedding of ``text`` using the /api/embeddings endpoint.
+
+        Parameters
+        ----------
+        model:
+            The name of the embedding model to query.
+        text:
+            Text to embed.
+        timeout:
+            As for :meth:`generate`.
+        """
+
+        payload = {"model": model, "prompt": text}
+        timeout = self.read_timeout if timeout is None else timeout
+        data = self._post("/api/embeddings", payload, timeout, idempotent=True)
+        return data.get("embedding", [])
+
+    def preload(
+        self,
+        model: str,
+        keep_alive: str | None = None,
+        *,
+        options: Optional[Dict[str, object]] = None,
+    ) -> None:
+        """Load ``model`` into memory without generating anything.
+
+        Sends an empty prompt, which makes the server load the weights and
+        keep them resident for ``keep_alive`` (default :attr:`keep_alive`), so
+        the first real request does not pay the loading time. Pass the
+        ``options`` of the later requests: a different ``num_ctx`` or other
+        load-time option would make the server load the model again.
+        """
+
+        payload = self._payload(
+            model, False, options, prompt="", keep_alive=keep_alive or self.keep_alive
+        )
+        self._post("/api/generate", payload, 600, idempotent=True)
+
+    async def agenerate(
+        self,
+        model: str,
+        prompt: str,
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **_: object,
+    ) -> str:
+        """Asynchronous counterpart of :meth:`generate`.
+
+        Requests are sent through a single :class:`aiohttp.ClientSession`
+        shared by every call on this client. Its connection pool is limited to
+        :attr:`max_parallel` connections. Call :meth:`aclose` when finished.
+        """
+
+        payload = self._payload(
+            model,
+            stream or on_token is not None,
+            options,
+            prompt=prompt,
+            keep_alive=self.keep_alive,
+        )
+        timeout = self.read_timeout if timeout is None else timeout
+        idempotent = _idempotent(idempotent, options)
+        if payload["stream"]:
+            return await self._apost_stream(
+                "/api/generate", payload, timeout, idempotent, _generate_text, on_token
+            )
+        return _generate_text(await self._apost("/api/generate", payload, timeout, idempotent))
+
+    async def achat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **_: object,
+    ) -> str:
+        """Asynchronous counterpart of :meth:`chat`."""
+
+        payload = self._payload(
+            model,
+            stream or on_token is not None,
+            options,
+            messages=messages,
+            keep_alive=self.keep_alive,
+        )
+        timeout = self.read_timeout if timeout is None else timeout
+        idempotent = _idempotent(idempotent, options)
+        if payload["stream"]:
+            return await self._apost_stream(
+                "/api/chat", payload, timeout, idempotent, _chat_text, on_token
+            )
+        return _chat_text(await self._apost("/api/chat", payload, timeout, idempotent))
+
+    async def aclose(self) -> None:
+        """Close the session used by the asynchronous methods, if any."""
+
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    def _post(self, path: str, payload: Dict, timeout: float, idempotent: bool) -> Dict:
+        """POST ``payload`` to ``path`` and return the decoded JSON reply.
+
+        ``timeout`` is the read timeout. Failed requests are retried as
+        described in :meth:`_with_retries`.
+        """
+
+        def send() -> Dict:
+            response = self._get_session().post(
+                f"{self.base_url}{path}",
+                data=_dumps(payload),
+                headers=_JSON_HEADERS,
+                timeout=(self.connect_timeout, timeout),
+            )
+            response.raise_for_status()
+            return _loads(response.content)
+
+        return self._with_retries(send, idempotent)
+
+    def _post_stream(
+        self,
+        path: str,
+        payload: Dict,
+        timeout: float,
+        idempotent: bool,
+        extract: Callable[[Dict], str],
+        on_token: Optional[Callable[[str], None]],
+    ) -> str:
+        """POST a streaming request and return the concatenated text.
+
+        The server replies with one JSON object per line. ``extract`` returns
+        the text carried by each object, which is passed to ``on_token`` as it
+        arrives. A request is not retried once text has been received, as that
+        would hand the same text to ``on_token`` twice.
+        """
+
+        parts: List[str] = []
+
+        def send() -> str:
+            with self._get_session().post(
+                f"{self.base_url}{path}",
+                data=_dumps(payload),
+                headers=_JSON_HEADERS,
+                timeout=(self.connect_timeout, timeout),
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if _read_chunk(line, extract, parts, on_token):
+                        break
+            return "".join(parts)
+
+        return self._with_retries(send, idempotent, lambda: not parts)
+
+    def _with_retries(
+        self,
+        send: Callable[[], T],
+        idempotent: bool,
+        can_retry: Callable[[], bool] = lambda: True,
+    ) -> T:
+        """Call ``send``, retrying transient failures with exponential backoff.
+
+        Failures that happen before the server starts working on the request,
+        i.e. failing to connect and ``429``/``503`` replies, are always
+        retried. Other connection errors, such as a dropped connection, read
+        timeouts and ``5xx`` replies are only retried for ``idempotent``
+        requests, since the server may already have generated a response. Up
+        to :attr:`max_retries` retries are made, waiting for the
+        ``Retry-After`` header when present; see :func:`_backoff`.
+        """
+
+        attempt = 0
+        while True:
+            try:
+                return send()
+            except Exception as exc:
+                retryable, retry_after = _requests_retry(exc, idempotent)
+                delay = _backoff(attempt, retry_after) if retryable else None
+                if delay is None or attempt >= self.max_retries or not can_retry():
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def _apost(self, path: str, payload: Dict, timeout: float, idempotent: bool) -> Dict:
+        """Asynchronous counterpart of :meth:`_post`."""
+
+        async def send() -> Dict:
+            session = self._get_async_session()
+            async with session.post(
+                f"{self.base_url}{path}",
+                data=_dumps(payload),
+                headers=_JSON_HEADERS,
+                timeout=self._async_timeout(timeout),
+            ) as response:
+                response.raise_for_status()
+                return _loads(await response.read())
+
+        return await self._awith_retries(send, idempotent)
+
+    async def _apost_stream(
+        self,
+        path: str,
+        payload: Dict,
+        timeout: float,
+        idempotent: bool,
+        extract: Callable[[Dict], str],
+        on_token: Optional[Callable[[str], None]],
+    ) -> str:
+        """Asynchronous counterpart of :meth:`_post_stream`."""
+
+        parts: List[str] = []
+
+        async def send() -> str:
+            session = self._get_async_session()
+            async with session.post(
+                f"{self.base_url}{path}",
+                data=_dumps(payload),
+                headers=_JSON_HEADERS,
+                timeout=self._async_timeout(timeout),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    if _read_chunk(line, extract, parts, on_token):
+                        break
+            return "".join(parts)
+
+        return await self._awith_retries(send, idempotent, lambda: not parts)
+
+    async def _awith_retries(
+        self,
+        send: Callable[[], Awaitable[T]],
+        idempotent: bool,
+        can_retry: Callable[[], bool] = lambda: True,
+    ) -> T:
+        """Asynchronous counterpart of :meth:`_with_retries`."""
+
+        import asyncio
+
+        attempt = 0
+        while True:
+            try:
+                return await send()
+            except Exception as exc:
+                retryable, retry_after = _aiohttp_retry(exc, idempotent)
+                delay = _backoff(attempt, retry_after) if retryable else None
+                if delay is None or attempt >= self.max_retries or not can_retry():
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _async_timeout(self, timeout: float) -> "aiohttp.ClientTimeout":
+        """Return the aiohttp timeout for a request with read timeout ``timeout``."""
+
+        import aiohttp
+
+        return aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=timeout)
+
+    def _get_session(self) -> "requests.Session":
+        """Return the shared synchronous session, creating it on first use.
+
+        ``requests`` is imported here rather than at module level so that
+        programs which only use the asynchronous methods, or only import this
+        module, do not pay for loading it.
+        """
+
+        if self._session is not None:
+            return self._session
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError as exc:  # pragma: no cover - network library missing
+            raise ImportError("The 'requests' package is required to call the OLLAMA API") from exc
+        # Threads calling the client for the first time, e.g. when preloading
+        # both models, must not each create a session.
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+        return self._session
+
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """Return the shared asynchronous session, creating it on first use."""
+
+        try:
+            import aiohttp
+        except ImportError as exc:  # pragma: no cover - network library missing
+            raise ImportError(
+                "The 'aiohttp' package is required for asynchronous OLLAMA calls"
+            ) from exc
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_parallel)
+            self._async_session = aiohttp.ClientSession(connector=connector)
+        return self._async_session
+
+    def _payload(
+        self,
+        model: str,
+        stream: bool,
+        options: Optional[Dict[str, object]],
+        **fields: object,
+    ) -> Dict:
+        """Build the JSON body shared by ``/api/generate`` and ``/api/chat``.
+
+        ``num_ctx`` is always sent so that every request for ``model`` uses
+        the same context size; changing it forces the server to reload the
+        model and discard its cache.
         """
 
-        url = f"{self.base_url}/api/generate"
-        payload: Dict = {
-            "model": model,
-            "prompt": prompt,
-            "stream": stream,
-        }
-        options: Dict | None = kwargs.get("options")  # type: ignore[assignment]
-        timeout = int(kwargs.get("timeout", 60))
-        if options:
-            payload["options"] = options
-
-        if requests is None:  # pragma: no cover - network library missing
-            raise ImportError("The 'requests' package is required to call the OLLAMA API")
-
-        response = requests.post(url, json=payload, timeout=timeout)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("response", "")
+        payload: Dict = {"model": model, **fields, "stream": stream}
+        payload["options"] = {"num_ctx": self.num_ctx, **(options or {})}
+        return payload
+
+
+def _generate_text(data: Dict) -> str:
+    """Return the text of an ``/api/generate`` response or stream chunk."""
+
+    return data.get("response", "")
+
+
+def _chat_text(data: Dict) -> str:
+    """Return the text of an ``/api/chat`` response or stream chunk."""
+
+    return data.get("message", {}).get("content", "")
+
+
+def _read_chunk(
+    line: bytes,
+    extract: Callable[[Dict], str],
+    parts: List[str],
+    on_token: Optional[Callable[[str], None]],
+) -> bool:
+    """Handle one line of a streamed reply and return whether it was the last.
+
+    The text of the chunk is appended to ``parts``, which the caller joins
+    once at the end so that long replies are not built by repeated
+    concatenation.
+    """
+
+    if not line.strip():
+        return False
+    chunk = _loads(line)
+    text = extract(chunk)
+    if text:
+        parts.append(text)
+        if on_token is not None:
+            on_token(text)
+    return bool(chunk.get("done"))
+
+
+def _dumps(payload: Dict) -> bytes:
+    """Encode a request body, using ``orjson`` when it is installed."""
+
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+def _loads(body: bytes) -> Dict:
+    """Decode a response body, using ``orjson`` when it is installed."""
+
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _idempotent(idempotent: Optional[bool], options: Optional[Dict[str, object]]) -> bool:
+    """Return whether repeating a request gives the same result.
+
+    This is the caller's ``idempotent`` argument when given, otherwise whether
+    the request explicitly uses a ``temperature`` of zero.
+    """
+
+    if idempotent is not None:
+        return idempotent
+    return (options or {}).get("temperature") == 0
+
+
+def _status_retry(
+    status: int, headers: Mapping[str, str], idempotent: bool
+) -> Tuple[bool, Optional[float]]:
+    """Classify an HTTP error status like :func:`_requests_retry`."""
+
+    if status in (429, 503) or (status >= 500 and idempotent):
+        return True, _retry_after(headers.get("Retry-After"))
+    return False, None
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the delay of a ``Retry-After`` header, or ``None`` if absent or invalid."""
+
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # Imported here as HTTP dates are rare and the import is slow.
+        import email.utils
+
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+
+def _requests_retry(exc: Exception, idempotent: bool) -> Tuple[bool, Optional[float]]:
+    """Classify a ``requests`` failure for :meth:`OllamaClient._with_retries`.
+
+    Returns whether the request may be retried, and the delay the server
+    asked for, if any.
+    """
+
+    import requests
+
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return _status_retry(exc.response.status_code, exc.response.headers, idempotent)
+    if isinstance(exc, requests.ConnectTimeout) or _connect_failed(exc):
+        return True, None
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)) and idempotent:
+        return True, None
+    return False, None
+
+
+def _connect_failed(exc: Exception) -> bool:
+    """Return whether a ``requests`` error means no connection was established."""
+
+    import requests
+    import urllib3
+
+    if not isinstance(exc, requests.ConnectionError) or not exc.args:
+        return False
+    error = exc.args[0]
+    reason = getattr(error, "reason", error)
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+def _aiohttp_retry(exc: Exception, idempotent: bool) -> Tuple[bool, Optional[float]]:
+    """Classify an ``aiohttp`` failure like :func:`_requests_retry`."""
+
+    import asyncio
+
+    import aiohttp
+
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return _status_retry(exc.status, exc.headers or {}, idempotent)
+    if isinstance(exc, (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)):
+        return True, None
+    if isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError)) and idempotent:
+        return True, None
+    return False, None
+
+
+# Longest ``Retry-After`` delay waited for; a server asking for more fails the request.
+_MAX_RETRY_AFTER = 60.0
+
+
+def _backoff(attempt: int, retry_after: Optional[float]) -> Optional[float]:
+    """Return how long to wait before retry number ``attempt + 1``.
+
+    The server's ``Retry-After`` delay wins when given, including ``0``, and
+    ``None`` is returned when it exceeds :data:`_MAX_RETRY_AFTER`, as waiting
+    that long would stall the conversation. Otherwise the wait doubles from
+    one second per attempt, with up to a second of random jitter, and is
+    capped at ten seconds.
+    """
+
+    if retry_after is not None:
+        return retry_after if retry_after <= _MAX_RETRY_AFTER else None
+    return min(10.0, 2.0**attempt + random.uniform(0.0, 1.0))
@@ -1,12 +1,17 @@
 """Client utilities for interacting with the OpenAI API."""
 from __future__ import annotations
 
-from typing import Optional
+import importlib.util
+import json
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
-try:  # pragma: no cover - import is trivial
-    from openai import OpenAI  # type: ignore
-except Exception:  # pragma: no cover - handled in generate
-    OpenAI = None  # type: ignore
+from ollama_client import _backoff, _idempotent, _status_retry
+
+if TYPE_CHECKING:  # pragma: no cover - imported lazily at runtime
+    from openai import AsyncOpenAI
+
+T = TypeVar("T")
 
 
 class OpenAIClient:
@@ -19,21 +24,359 @@ class OpenAIClient:
         environment variable is used.
     base_url:
         Optional alternative base URL for the API.
+    max_connections:
+        Size of the connection pool shared by concurrent requests.
+    connect_timeout, read_timeout:
+        Seconds to wait for a connection, and between bytes of the reply.
+    max_retries:
+        How many times a completion request is retried, with exponential
+        backoff that honours a ``Retry-After`` header of up to a minute. As for
+        :class:`ollama_client.OllamaClient`, ``429`` and ``503`` replies are
+        always retried, while other ``5xx`` replies, connection errors and
+        timeouts are only retried for idempotent requests, i.e. with a
+        ``temperature`` of zero or ``idempotent=True``. The Batch API calls of
+        :meth:`run_batch` use the SDK's own retries.
+
+    Requests go through a tuned :mod:`httpx` transport: a large keep-alive pool
+    and, when the ``h2`` package is installed, HTTP/2 so that many concurrent
+    conversations are multiplexed over a few connections.
+
+    The asynchronous client is created on first use and again after
+    :meth:`aclose`, so the same instance can be used from successive event
+    loops as long as it is closed before each loop ends.
     """
 
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
-        if OpenAI is None:  # pragma: no cover - network library missing
-            raise ImportError("The 'openai' package is required to call the OpenAI API")
-        self._client = OpenAI(api_key=api_key, base_url=base_url)
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+    ) -> None:
+        # Imported here so that importing this module stays cheap; the SDK
+        # pulls in httpx and pydantic.
+        try:
+            import httpx
+            from openai import OpenAI
+        except ImportError as exc:  # pragma: no cover - network library missing
+            raise ImportError("The 'openai' package is required to call the OpenAI API") from exc
+
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self._http2 = importlib.util.find_spec("h2") is not None
+        self._limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections // 2
+        )
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        http_client = httpx.Client(
+            transport=httpx.HTTPTransport(http2=self._http2, limits=self._limits, retries=2),
+            timeout=self._timeout,
+        )
+        self._client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=max_retries,
+            http_client=http_client,
+        )
+        # Completions are retried by _with_retries, which knows whether that is safe.
+        self._chat_client = self._client.with_options(max_retries=0)
+        self._async_client: Optional["AsyncOpenAI"] = None
+
+    def close(self) -> None:
+        """Close the HTTP connections held by the synchronous client."""
 
-    def generate(self, model: str, prompt: str, stream: bool = False, **_: object) -> str:
+        self._client.close()
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        **_: object,
+    ) -> str:
         """Generate a completion from the OpenAI API."""
 
+        messages = [{"role": "user", "content": prompt}]
+        return self.chat(
+            model, messages, stream, options=options, timeout=timeout, idempotent=idempotent
+        )
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        **_: object,
+    ) -> str:
+        """Generate the next assistant message for ``messages``.
+
+        ``options`` uses OLLAMA's format; the entries the chat completions API
+        understands are forwarded, the rest are ignored. ``timeout`` is the
+        time limit of each attempt in seconds, ``None`` meaning the client's
+        connect and read timeouts. ``idempotent`` overrides whether failed
+        requests may be retried; see ``max_retries``.
+        """
+
         if stream:  # pragma: no cover - streaming not implemented
             raise NotImplementedError("Streaming responses are not supported")
-        response = self._client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
+        params = _completion_params(options)
+        if timeout is not None:
+            params["timeout"] = timeout
+
+        def send() -> str:
+            response = self._chat_client.chat.completions.create(
+                model=model,
+                messages=messages,  # type: ignore[arg-type]
+                **params,
+            )
+            return response.choices[0].message.content or ""
+
+        return self._with_retries(send, _idempotent(idempotent, options))
+
+    def run_batch(
+        self,
+        model: str,
+        conversations: List[List[Dict[str, str]]],
+        poll_interval: float = 10.0,
+        *,
+        options: Optional[Dict[str, object]] = None,
+    ) -> List[str]:
+        """Answer many independent conversations through the Batch API.
+
+        One chat completion request per conversation is written to a JSONL
+        file, uploaded and submitted as a single batch. The method then polls
+        until the batch finishes, which may take up to the 24 hour completion
+        window, in exchange for the Batch API's lower cost and higher limits.
+        The input, output and error files are deleted once the results are
+        read, or when waiting for them fails.
+
+        Parameters
+        ----------
+        model:
+            Model answering every conversation.
+        conversations:
+            Messages of each conversation.
+        poll_interval:
+            Seconds to wait between status checks.
+        options:
+            As for :meth:`chat`.
+
+        Returns
+        -------
+        list of str
+            The reply to each conversation, in the same order.
+        """
+
+        params = _completion_params(options)
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": str(i),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {"model": model, "messages": messages, **params},
+                }
+            )
+            for i, messages in enumerate(conversations)
+        ]
+        upload = self._client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch"
         )
-        return response.choices[0].message.content or ""
+        batch = None
+        try:
+            batch = self._client.batches.create(
+                input_file_id=upload.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(poll_interval)
+                batch = self._client.batches.retrieve(batch.id)
+            if batch.status != "completed" or batch.output_file_id is None:
+                raise RuntimeError(f"Batch {batch.id} finished with status {batch.status!r}")
+            content = self._client.files.content(batch.output_file_id).text
+        finally:
+            file_ids = [upload.id]
+            if batch is not None:
+                file_ids += [batch.output_file_id, batch.error_file_id]
+            self._delete_files([f for f in file_ids if f])
+
+        replies: Dict[int, str] = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                raise RuntimeError(
+                    f"Batch request {result.get('custom_id')} failed: "
+                    f"{result.get('error') or response.get('body')}"
+                )
+            message = response["body"]["choices"][0]["message"]
+            replies[int(result["custom_id"])] = message.get("content") or ""
+        missing = [i for i in range(len(conversations)) if i not in replies]
+        if missing:
+            raise RuntimeError(f"Batch {batch.id} returned no result for requests {missing}")
+        return [replies[i] for i in range(len(conversations))]
+
+    def _delete_files(self, file_ids: List[str]) -> None:
+        """Delete uploaded or generated files, ignoring files that cannot be deleted.
+
+        This is cleanup after the batch, so a failure here must not hide its
+        result or the error that ended it.
+        """
+
+        import openai
+
+        for file_id in file_ids:
+            try:
+                self._client.files.delete(file_id)
+            except openai.OpenAIError:
+                pass
+
+    async def agenerate(
+        self,
+        model: str,
+        prompt: str,
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        **_: object,
+    ) -> str:
+        """Asynchronous counterpart of :meth:`generate`."""
+
+        messages = [{"role": "user", "content": prompt}]
+        return await self.achat(
+            model, messages, stream, options=options, timeout=timeout, idempotent=idempotent
+        )
+
+    async def achat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        *,
+        options: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        **_: object,
+    ) -> str:
+        """Asynchronous counterpart of :meth:`chat`."""
+
+        if stream:  # pragma: no cover - streaming not implemented
+            raise NotImplementedError("Streaming responses are not supported")
+        params = _completion_params(options)
+        if timeout is not None:
+            params["timeout"] = timeout
+
+        async def send() -> str:
+            response = await self._get_async_client().chat.completions.create(
+                model=model,
+                messages=messages,  # type: ignore[arg-type]
+                **params,
+            )
+            return response.choices[0].message.content or ""
+
+        return await self._awith_retries(send, _idempotent(idempotent, options))
+
+    async def aclose(self) -> None:
+        """Close the HTTP connections held by the asynchronous client, if any."""
+
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def _get_async_client(self) -> "AsyncOpenAI":
+        """Return the asynchronous SDK client, creating it on first use."""
+
+        if self._async_client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            transport = httpx.AsyncHTTPTransport(
+                http2=self._http2, limits=self._limits, retries=2
+            )
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(transport=transport, timeout=self._timeout),
+            )
+        return self._async_client
+
+    def _with_retries(self, send: Callable[[], T], idempotent: bool) -> T:
+        """Call ``send``, retrying the failures allowed by ``max_retries``."""
+
+        attempt = 0
+        while True:
+            try:
+                return send()
+            except Exception as exc:
+                retryable, retry_after = _openai_retry(exc, idempotent)
+                delay = _backoff(attempt, retry_after) if retryable else None
+                if delay is None or attempt >= self.max_retries:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def _awith_retries(self, send: Callable[[], Awaitable[T]], idempotent: bool) -> T:
+        """Asynchronous counterpart of :meth:`_with_retries`."""
+
+        import asyncio
+
+        attempt = 0
+        while True:
+            try:
+                return await send()
+            except Exception as exc:
+                retryable, retry_after = _openai_retry(exc, idempotent)
+                delay = _backoff(attempt, retry_after) if retryable else None
+                if delay is None or attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# OLLAMA option names and the chat completions parameters they correspond to.
+_OPTION_PARAMS = {
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "seed": "seed",
+    "stop": "stop",
+    "num_predict": "max_tokens",
+}
+
+
+def _openai_retry(exc: Exception, idempotent: bool) -> Tuple[bool, Optional[float]]:
+    """Classify an SDK failure like :func:`ollama_client._requests_retry`.
+
+    The SDK does not say whether a timeout happened while connecting, so
+    connection errors and timeouts are only retried for idempotent requests.
+    """
+
+    import openai
+
+    if isinstance(exc, openai.APIStatusError):
+        return _status_retry(exc.status_code, exc.response.headers, idempotent)
+    if isinstance(exc, openai.APIConnectionError) and idempotent:
+        return True, None
+    return False, None
+
+
+def _completion_params(options: Optional[Dict[str, object]]) -> Dict[str, object]:
+    """Translate an OLLAMA style ``options`` mapping to completion parameters."""
 
+    return {_OPTION_PARAMS[k]: v for k, v in (options or {}).items() if k in _OPTION_PARAMS}
@@ -0,0 +1,196 @@
+"""Tests for the conversation drivers and speculative next-turn requests."""
+from __future__ import annotations
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+import pytest
+
+from conversation import Turn, _Speculation, _Transcript, ahave_conversation
+
+
+class FakeAsyncClient:
+    """Async client streaming scripted replies, one sentence per token.
+
+    The reply to a request is looked up by the content of its last message,
+    falling back to a reply naming the model and the number of messages.
+    """
+
+    def __init__(self, replies: Optional[Dict[str, str]] = None) -> None:
+        self.replies = replies or {}
+        self.requests: List[List[Dict[str, str]]] = []
+        self.cancelled = 0
+
+    def reply(self, model: str, messages: List[Dict[str, str]]) -> str:
+        return self.replies.get(messages[-1]["content"], f"{model} {len(messages)}. Done.")
+
+    async def agenerate(self, model: str, prompt: str, stream: bool = False, **_: object) -> str:
+        return await self.achat(model, [{"role": "user", "content": prompt}], stream)
+
+    async def achat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        *,
+        on_token: Optional[Callable[[str], None]] = None,
+        **_: object,
+    ) -> str:
+        self.requests.append(list(messages))
+        text = self.reply(model, messages)
+        try:
+            for token in text.split(" "):
+                await asyncio.sleep(0)
+                if on_token is not None:
+                    on_token(token if token == text.split(" ")[-1] else token + " ")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return text
+
+
+def _speculation(client: FakeAsyncClient) -> _Speculation:
+    return _Speculation(client, "b", _Transcript(None, "topic"), "a", None)
+
+
+def test_resolve_returns_request_that_assumed_the_response() -> None:
+    async def run() -> None:
+        client = FakeAsyncClient({"One. Two.": "Reply."})
+        speculation = _speculation(client)
+        for token in ("One. ", "Two."):
+            speculation.on_token(token)
+        task = speculation.resolve("One. Two.")
+        assert task is not None
+        assert await task == "Reply."
+        assert client.requests[-1][-1] == {"role": "user", "content": "One. Two."}
+
+    asyncio.run(run())
+
+
+def test_resolve_cancels_request_for_a_different_response() -> None:
+    async def run() -> None:
+        client = FakeAsyncClient()
+        speculation = _speculation(client)
+        speculation.on_token("One. ")
+        task = speculation._task
+        assert speculation.resolve("One. Two") is None
+        assert task is not None
+        await asyncio.sleep(0)
+        assert task.cancelled()
+        assert speculation._task is None
+
+    asyncio.run(run())
+
+
+def test_new_sentence_replaces_earlier_speculation() -> None:
+    async def run() -> None:
+        client = FakeAsyncClient()
+        speculation = _speculation(client)
+        speculation.on_token("One. ")
+        first = speculation._task
+        speculation.on_token("Two. ")
+        second = speculation._task
+        assert speculation.resolve("One. Two. ") is second
+        await asyncio.sleep(0)
+        assert first is not None and first.cancelled()
+        speculation.cancel()
+        assert speculation._task is None
+
+    asyncio.run(run())
+
+
+def test_speculative_conversation_matches_sequential_one() -> None:
+    async def run(speculative: bool) -> List[Turn]:
+        client = FakeAsyncClient()
+        return await ahave_conversation(
+            "a", "b", "topic", turns=5, client=client, speculative=speculative
+        )
+
+    assert asyncio.run(run(True)) == asyncio.run(run(False))
+
+
+def test_speculation_is_skipped_with_summary_fn() -> None:
+    calls: List[List[str]] = []
+
+    def summary_fn(lines: List[str]) -> str:
+        calls.append(lines)
+        return "summary"
+
+    async def run(speculative: bool) -> int:
+        client = FakeAsyncClient()
+        await ahave_conversation(
+            "a",
+            "b",
+            "topic",
+            turns=6,
+            client=client,
+            window=1,
+            summary_fn=summary_fn,
+            speculative=speculative,
+        )
+        return len(client.requests)
+
+    assert asyncio.run(run(False)) == 6
+    sequential_calls = len(calls)
+    calls.clear()
+    assert asyncio.run(run(True)) == 6
+    assert len(calls) == sequential_calls
+
+
+@pytest.mark.parametrize("window", [0, -1])
+def test_window_must_keep_an_exchange(window: int) -> None:
+    with pytest.raises(ValueError):
+        _Transcript(None, "topic", window=window)
+
+
+def _words(text: str) -> int:
+    """Count tokens as words, for predictable budgets."""
+
+    return len(text.split())
+
+
+def _message(n: int) -> str:
+    """Return a message of eight words, i.e. twelve tokens with the overhead."""
+
+    return " ".join(["word"] * 7 + [str(n)])
+
+
+def test_fit_drops_oldest_messages_without_summary_fn() -> None:
+    transcript = _Transcript(None, "p", token_limit=30, count_tokens=_words)
+    for n in range(5):
+        transcript.add("user", "b", _message(n))
+        assert transcript._total_tokens <= 30
+    assert [m["content"] for m in transcript.messages] == ["p", _message(3), _message(4)]
+
+
+def test_fit_keeps_and_extends_the_summary() -> None:
+    summarised: List[List[str]] = []
+
+    def summary_fn(lines: List[str]) -> str:
+        summarised.append(lines)
+        return "summary"
+
+    transcript = _Transcript(
+        None, "p", summary_fn=summary_fn, token_limit=30, count_tokens=_words
+    )
+    for n in range(5):
+        transcript.add("user", "b", _message(n))
+        assert transcript._total_tokens <= 30
+    assert transcript.lines == ["summary", f"b: {_message(4)}"]
+    # Each later summary covers the previous one rather than discarding it.
+    assert all(lines[0] == "summary" for lines in summarised[1:])
+    assert len(summarised) == 4
+
+
+def test_fit_raises_when_newest_message_does_not_fit() -> None:
+    transcript = _Transcript(
+        None, "p", summary_fn=lambda lines: "summary", token_limit=30, count_tokens=_words
+    )
+    transcript.add("user", "b", _message(0))
+    with pytest.raises(ValueError):
+        transcript.add("user", "b", " ".join(["word"] * 40))
+
+
+def test_fit_raises_when_static_prefix_does_not_fit() -> None:
+    with pytest.raises(ValueError):
+        _Transcript("system " * 40, "p", token_limit=30, count_tokens=_words)
@@ -0,0 +1,133 @@
+"""Tests for the template-aware :class:`llm_cache.GenerativeCache`."""
+from __future__ import annotations
+
+from typing import Dict, List
+
+from llm_cache import _TOKEN_RE, GenerativeCache
+
+
+class FakeClient:
+    """Client answering from a fixed mapping and recording every request."""
+
+    def __init__(self, replies: Dict[str, str]) -> None:
+        self.replies = replies
+        self.calls: List[str] = []
+
+    def generate(self, model: str, prompt: str, stream: bool = False, **_: object) -> str:
+        self.calls.append(prompt)
+        return self.replies.get(prompt, f"rewritten for {model}")
+
+
+def _tokens(text: str) -> List[str]:
+    """Tokenise ``text`` the way :class:`GenerativeCache` does."""
+
+    return _TOKEN_RE.findall(text)
+
+
+def test_slots_finds_replaced_spans() -> None:
+    cache = GenerativeCache(FakeClient({}))
+    old = _tokens("Translate the word 'cat' to French please")
+    new = _tokens("Translate the word 'dog' to French please")
+    assert cache._slots(old, new) == [("cat", "dog")]
+
+
+def test_slots_rejects_insertions_and_too_many_spans() -> None:
+    cache = GenerativeCache(FakeClient({}), max_slots=1)
+    old = _tokens("Translate the word cat to French please")
+    assert cache._slots(old, _tokens("Translate the word big cat to French please")) is None
+    assert cache._slots(old, _tokens("Translate the term cat to German please")) is None
+
+
+def test_slots_requires_shared_words() -> None:
+    cache = GenerativeCache(FakeClient({}), min_shared_words=4)
+    assert cache._slots(_tokens("Say cat now"), _tokens("Say dog now")) is None
+
+
+def test_slots_rejects_long_spans() -> None:
+    cache = GenerativeCache(FakeClient({}), max_slots=1, max_slot_tokens=5)
+    template = "Summarise the following text for me: {}"
+    old = _tokens(template.format("one two three"))
+    assert cache._slots(old, _tokens(template.format("four five six"))) == [
+        ("one two three", "four five six")
+    ]
+    assert cache._slots(old, _tokens(template.format("four five six seven"))) is None
+
+
+def test_middles_bounds_the_compared_tokens() -> None:
+    cache = GenerativeCache(FakeClient({}), max_slots=2, max_slot_tokens=4)
+    old = _tokens("Shared start " + "a " * 20 + "shared end")
+    assert cache._middles(old, _tokens("Shared start " + "b " * 20 + "shared end")) is None
+    assert cache._middles(old, _tokens("Shared start " + "a " * 19 + "b shared end")) == (
+        _tokens("Shared start " + "a " * 19).__len__(),
+        len(_tokens(" shared end")),
+    )
+
+
+def test_adapt_substitutes_whole_words_only() -> None:
+    cache = GenerativeCache(FakeClient({}), substitute=True)
+    response = "The category of cat is mammal; a cat purrs."
+    adapted = cache._adapt("old", "new", response, [("cat", "dog")])
+    assert adapted == "The category of dog is mammal; a dog purrs."
+
+
+def test_adapt_requires_every_slot_in_response() -> None:
+    cache = GenerativeCache(FakeClient({}), substitute=True)
+    assert cache._adapt("old", "new", "The category is mammal.", [("cat", "dog")]) is None
+
+
+def test_adapt_does_not_substitute_numbers_or_short_slots() -> None:
+    cache = GenerativeCache(FakeClient({}), substitute=True)
+    assert cache._adapt("old", "new", "Yes, 7 is prime.", [("7", "8")]) is None
+    assert cache._adapt("old", "new", "An ox is big.", [("ox", "elk")]) is None
+
+
+def test_adapt_rejects_new_value_already_in_response() -> None:
+    cache = GenerativeCache(FakeClient({}), substitute=True)
+    response = "Unlike a dog, a cat climbs trees."
+    assert cache._adapt("old", "new", response, [("cat", "dog")]) is None
+
+
+def test_adapt_falls_back_to_rewrite_model() -> None:
+    inner = FakeClient({})
+    cache = GenerativeCache(inner, rewrite_model="small")
+    adapted = cache._adapt("Is 7 prime?", "Is 8 prime?", "Yes, 7 is prime.", [("7", "8")])
+    assert adapted == "rewritten for small"
+    assert "Is 8 prime?" in inner.calls[-1]
+
+
+def test_generate_reuses_templated_response() -> None:
+    inner = FakeClient({"Describe the animal called cat in one short line": "A cat is a pet."})
+    cache = GenerativeCache(inner, substitute=True)
+    cache.generate("m", "Describe the animal called cat in one short line")
+    assert cache.generate("m", "Describe the animal called dog in one short line") == (
+        "A dog is a pet."
+    )
+    assert cache.hits == 1
+    assert len(inner.calls) == 1
+
+
+def test_generate_calls_model_for_numeric_slot() -> None:
+    inner = FakeClient({"Please tell me whether 7 is prime": "Yes, 7 is prime."})
+    cache = GenerativeCache(inner)
+    cache.generate("m", "Please tell me whether 7 is prime")
+    assert cache.generate("m", "Please tell me whether 8 is prime") == "rewritten for m"
+    assert cache.misses == 2
+
+
+
+def test_generate_does_not_substitute_by_default() -> None:
+    inner = FakeClient({"What is the capital city of France?": "The capital of France is Paris."})
+    cache = GenerativeCache(inner)
+    cache.generate("m", "What is the capital city of France?")
+    assert cache.generate("m", "What is the capital city of Spain?") == "rewritten for m"
+    assert cache.hits == 0
+    assert len(inner.calls) == 2
+
+
+def test_default_adapt_uses_rewrite_model_instead_of_substituting() -> None:
+    inner = FakeClient({})
+    cache = GenerativeCache(inner, rewrite_model="small")
+    response = "Hamlet was written by William Shakespeare."
+    slots = [("Hamlet", "Ulysses")]
+    adapted = cache._adapt("Who wrote Hamlet?", "Who wrote Ulysses?", response, slots)
+    assert adapted == "rewritten for small"
@@ -0,0 +1,187 @@
+"""Tests for the retry policy of :class:`ollama_client.OllamaClient`."""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+import aiohttp
+import pytest
+import requests
+import urllib3
+
+import ollama_client
+from ollama_client import OllamaClient, _idempotent
+
+
+def _http_error(status: int, retry_after: Optional[str] = None) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return requests.HTTPError(response=response)
+
+
+def _refused() -> requests.ConnectionError:
+    reason = urllib3.exceptions.NewConnectionError(None, "Connection refused")  # type: ignore
+    return requests.ConnectionError(urllib3.exceptions.MaxRetryError(None, "/", reason))
+
+
+def _async_refused() -> aiohttp.ClientConnectorError:
+    key = SimpleNamespace(host="ollama", port=11434, ssl=False)
+    return aiohttp.ClientConnectorError(key, OSError(111, "Connection refused"))  # type: ignore
+
+
+class Flaky:
+    """``send`` callable failing with ``errors`` in turn before succeeding."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> List[float]:
+    """Record the delays passed to ``time.sleep`` instead of waiting."""
+
+    delays: List[float] = []
+    monkeypatch.setattr(ollama_client.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.mark.parametrize(
+    "error, idempotent, retried",
+    [
+        (_http_error(429), False, True),
+        (_http_error(503), False, True),
+        (_http_error(500), False, False),
+        (_http_error(500), True, True),
+        (_http_error(400), True, False),
+        (requests.ConnectTimeout(), False, True),
+        (_refused(), False, True),
+        (requests.ReadTimeout(), False, False),
+        (requests.ReadTimeout(), True, True),
+        (requests.ConnectionError(), False, False),
+        (requests.ConnectionError(), True, True),
+        (ValueError("bad reply"), True, False),
+    ],
+)
+def test_with_retries_matrix(
+    sleeps: List[float], error: Exception, idempotent: bool, retried: bool
+) -> None:
+    send = Flaky(error)
+    client = OllamaClient(base_url="http://ollama")
+    if retried:
+        assert client._with_retries(send, idempotent) == "ok"
+        assert send.calls == 2
+    else:
+        with pytest.raises(type(error)):
+            client._with_retries(send, idempotent)
+        assert send.calls == 1
+
+
+def test_with_retries_gives_up_after_max_retries(sleeps: List[float]) -> None:
+    send = Flaky(*(_http_error(503) for _ in range(3)))
+    client = OllamaClient(base_url="http://ollama", max_retries=2)
+    with pytest.raises(requests.HTTPError):
+        client._with_retries(send, idempotent=True)
+    assert send.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_with_retries_stops_once_stream_produced_text(sleeps: List[float]) -> None:
+    send = Flaky(requests.ReadTimeout())
+    client = OllamaClient(base_url="http://ollama")
+    with pytest.raises(requests.ReadTimeout):
+        client._with_retries(send, idempotent=True, can_retry=lambda: False)
+    assert send.calls == 1
+
+
+def test_with_retries_honours_retry_after(sleeps: List[float]) -> None:
+    client = OllamaClient(base_url="http://ollama")
+    assert client._with_retries(Flaky(_http_error(429, "2")), idempotent=False) == "ok"
+    when = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert client._with_retries(Flaky(_http_error(503, when)), idempotent=False) == "ok"
+    assert sleeps[0] == 2.0
+    assert 25.0 < sleeps[1] <= 30.0
+
+
+def _response_error(status: int) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(None, (), status=status)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize(
+    "error, idempotent, retried",
+    [
+        (_response_error(503), False, True),
+        (_response_error(500), False, False),
+        (_response_error(500), True, True),
+        (aiohttp.ConnectionTimeoutError(), False, True),
+        (_async_refused(), False, True),
+        (asyncio.TimeoutError(), False, False),
+        (asyncio.TimeoutError(), True, True),
+        (aiohttp.ServerDisconnectedError(), False, False),
+        (aiohttp.ServerDisconnectedError(), True, True),
+    ],
+)
+def test_awith_retries_matrix(
+    monkeypatch: pytest.MonkeyPatch, error: Exception, idempotent: bool, retried: bool
+) -> None:
+    async def no_sleep(delay: float) -> None:
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    flaky = Flaky(error)
+
+    async def send() -> str:
+        return flaky()
+
+    async def run() -> str:
+        return await OllamaClient(base_url="http://ollama")._awith_retries(send, idempotent)
+
+    if retried:
+        assert asyncio.run(run()) == "ok"
+        assert flaky.calls == 2
+    else:
+        with pytest.raises(type(error)):
+            asyncio.run(run())
+        assert flaky.calls == 1
+
+
+@pytest.mark.parametrize(
+    "idempotent, options, expected",
+    [
+        (None, None, False),
+        (None, {"temperature": 0}, True),
+        (None, {"temperature": 0.7}, False),
+        (True, {"temperature": 0.7}, True),
+        (False, {"temperature": 0}, False),
+    ],
+)
+def test_idempotent(idempotent: Optional[bool], options: Optional[dict], expected: bool) -> None:
+    assert _idempotent(idempotent, options) is expected
+
+
+def test_with_retries_honours_zero_retry_after(sleeps: List[float]) -> None:
+    client = OllamaClient(base_url="http://ollama")
+    assert client._with_retries(Flaky(_http_error(429, "0")), idempotent=False) == "ok"
+    assert client._with_retries(Flaky(_http_error(429)), idempotent=False) == "ok"
+    assert sleeps[0] == 0.0
+    assert 1.0 <= sleeps[1] <= 2.0
+
+
+def test_with_retries_gives_up_on_long_retry_after(sleeps: List[float]) -> None:
+    send = Flaky(_http_error(503, "3600"))
+    client = OllamaClient(base_url="http://ollama")
+    with pytest.raises(requests.HTTPError):
+        client._with_retries(send, idempotent=True)
+    assert send.calls == 1
+    assert sleeps == []
@@ -0,0 +1,74 @@
+"""Tests for :meth:`openai_client.OpenAIClient.run_batch` with a fake SDK."""
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from openai_client import OpenAIClient
+
+
+class FakeFiles:
+    """Stand-in for ``client.files`` recording uploads and deletions."""
+
+    def __init__(self, output: str) -> None:
+        self.output = output
+        self.deleted: List[str] = []
+
+    def create(self, file: object, purpose: str) -> SimpleNamespace:
+        return SimpleNamespace(id="input")
+
+    def content(self, file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(text=self.output)
+
+    def delete(self, file_id: str) -> None:
+        self.deleted.append(file_id)
+
+
+class FakeBatches:
+    """Stand-in for ``client.batches`` finishing with ``status``."""
+
+    def __init__(self, status: str) -> None:
+        self.status = status
+
+    def create(self, **_: object) -> SimpleNamespace:
+        return SimpleNamespace(
+            id="batch", status="in_progress", output_file_id=None, error_file_id=None
+        )
+
+    def retrieve(self, batch_id: str) -> SimpleNamespace:
+        output = "output" if self.status == "completed" else None
+        return SimpleNamespace(
+            id=batch_id, status=self.status, output_file_id=output, error_file_id="errors"
+        )
+
+
+def _result(custom_id: int, content: str) -> str:
+    body = {"choices": [{"message": {"content": content}}]}
+    return json.dumps(
+        {"custom_id": str(custom_id), "response": {"status_code": 200, "body": body}}
+    )
+
+
+def _client(status: str, output: str = "") -> OpenAIClient:
+    client = OpenAIClient(api_key="test")
+    client._client = SimpleNamespace(  # type: ignore[assignment]
+        files=FakeFiles(output), batches=FakeBatches(status)
+    )
+    return client
+
+
+def test_run_batch_returns_replies_in_order_and_deletes_files() -> None:
+    client = _client("completed", "\n".join([_result(1, "second"), _result(0, "first")]))
+    conversations = [[{"role": "user", "content": "a"}], [{"role": "user", "content": "b"}]]
+    assert client.run_batch("m", conversations, poll_interval=0) == ["first", "second"]
+    assert client._client.files.deleted == ["input", "output", "errors"]
+
+
+def test_run_batch_deletes_files_when_the_batch_fails() -> None:
+    client = _client("failed")
+    with pytest.raises(RuntimeError):
+        client.run_batch("m", [[{"role": "user", "content": "a"}]], poll_interval=0)
+    assert client._client.files.deleted == ["input", "errors"]
@@ -0,0 +1,61 @@
+"""Local estimates of how many tokens a prompt occupies in a model's context."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, ClassVar, Dict
+
+if TYPE_CHECKING:  # pragma: no cover - imported lazily at runtime
+    import tiktoken
+
+# Tokens reserved for the model's reply when checking a prompt against the
+# context window.
+RESPONSE_TOKENS = 512
+
+# Approximate tokens added per chat message by role markers and separators.
+MESSAGE_OVERHEAD = 4
+
+
+class TokenEstimator:
+    """Count tokens with :mod:`tiktoken` without contacting the server.
+
+    OpenAI models use their own encoding. Other models, such as those served
+    by OLLAMA, do not have a tiktoken encoding and are estimated with
+    ``cl100k_base``, which is close enough to keep a conversation within its
+    context window but is not exact.
+
+    Encodings are loaded once per model and shared by all instances.
+
+    Parameters
+    ----------
+    model:
+        Name of the model whose tokenizer is approximated.
+    """
+
+    _encodings: ClassVar[Dict[str, "tiktoken.Encoding"]] = {}
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self._encoding = self._encoding_for(model)
+
+    def count(self, text: str) -> int:
+        """Return the estimated number of tokens in ``text``."""
+
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    @classmethod
+    def _encoding_for(cls, model: str) -> "tiktoken.Encoding":
+        """Return the cached encoding for ``model``, loading it on first use."""
+
+        encoding = cls._encodings.get(model)
+        if encoding is None:
+            try:
+                import tiktoken
+            except ImportError as exc:  # pragma: no cover - optional dependency missing
+                raise ImportError(
+                    "The 'tiktoken' package is required to estimate token counts"
+                ) from exc
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            cls._encodings[model] = encoding
+        return encoding